@@ -0,0 +1,54 @@
+"""Concurrent hardware bring-up with per-subsystem readiness.
+
+Each driver's `init()` runs in its own worker thread after the server is already
+listening, so a slow camera doesn't hold up telemetry or the HTTP/WebSocket ports.
+"""
+
+import asyncio
+import time
+
+from app import metrics
+
+
+class BringUp:
+    """Tracks subsystem states (starting/ready/fallback/failed) and startup milestones."""
+
+    def __init__(self, started_at=None):
+        self.started_at = time.monotonic() if started_at is None else started_at
+        self.subsystems = {}
+        self.milestones = {}
+
+    def elapsed(self):
+        return round(time.monotonic() - self.started_at, 3)
+
+    async def start(self, name, init):
+        """Run `init` in a worker thread; returns True if real hardware came up.
+
+        `init` returns False when the hardware libraries are missing and the driver
+        serves simulated data ("fallback"), and raises if the device failed.
+        """
+        self.subsystems[name] = {"state": "starting"}
+        try:
+            present = await asyncio.to_thread(init)
+        except Exception as e:
+            self.subsystems[name] = {"state": "failed", "error": str(e), "seconds": self.elapsed()}
+            return False
+        seconds = self.elapsed()
+        self.subsystems[name] = {"state": "ready" if present else "fallback", "seconds": seconds}
+        metrics.SUBSYSTEM_READY_SECONDS.labels(subsystem=name).set(seconds)
+        return bool(present)
+
+    def mark(self, milestone):
+        """Record the first time a milestone such as "first_frame" is reached."""
+        if milestone not in self.milestones:
+            seconds = self.milestones[milestone] = self.elapsed()
+            metrics.STARTUP_MILESTONE_SECONDS.labels(milestone=milestone).set(seconds)
+
+    def status(self):
+        subsystems = dict(self.subsystems)
+        return {
+            "uptime_s": self.elapsed(),
+            "ready": bool(subsystems) and all(s["state"] != "starting" for s in subsystems.values()),
+            "subsystems": subsystems,
+            "milestones": dict(self.milestones),
+        }
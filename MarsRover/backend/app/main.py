@@ -1,17 +1,34 @@
+import time
+
+# Reference point for startup milestones (first frame, first telemetry)
+STARTED_AT = time.monotonic()
+
 from fastapi import FastAPI, WebSocket, UploadFile, File, HTTPException
-from fastapi.responses import StreamingResponse, JSONResponse, FileResponse
+from fastapi.responses import StreamingResponse, JSONResponse, FileResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import asyncio
 import os
-import io
 from drivers import lsm6dsox, bmp388, camera, xbee
+from app import metrics
+from app.bringup import BringUp
+from app.recorder import EventRecorder, ImuTrigger
 from dotenv import load_dotenv
 
 load_dotenv()
 HOST = os.getenv("HOST", "0.0.0.0")
 PORT = int(os.getenv("PORT", 8000))
 
+# Event recording: frames captured at RECORDER_FPS are kept in a RAM ring buffer
+# and dumped with pre/post-roll when the IMU, the API or an XBee command triggers.
+RECORDER_FPS = float(os.getenv("RECORDER_FPS", 5))
+RECORDER_MAX_BACKOFF = 5.0  # seconds between capture attempts while the camera is down
+IMU_TRIGGER_HZ = float(os.getenv("IMU_TRIGGER_HZ", 10))
+XBEE_RECORD_COMMAND = os.getenv("XBEE_RECORD_COMMAND", "RECORD").upper()
+
+# /debug/profile samples every thread's stack on demand; off unless explicitly enabled
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+
 app = FastAPI(title="MarsRover Backend")
 app.add_middleware(
     CORSMiddleware,
@@ -28,58 +45,190 @@ if os.path.isdir(static_dir):
 # In-memory list of connected WebSocket clients
 clients = set()
 
+recorder = EventRecorder(
+    out_dir=os.getenv("RECORDER_DIR", os.path.join(os.path.dirname(__file__), '..', 'recordings')),
+    max_bytes=int(float(os.getenv("RECORDER_BUFFER_MB", 64)) * 1024 * 1024),
+    max_seconds=float(os.getenv("RECORDER_BUFFER_SECONDS", 30)),
+    pre_roll=float(os.getenv("RECORDER_PRE_ROLL", 10)),
+    post_roll=float(os.getenv("RECORDER_POST_ROLL", 10)),
+    max_disk_bytes=int(float(os.getenv("RECORDER_MAX_DISK_MB", 1024)) * 1024 * 1024),
+    max_clips=int(os.getenv("RECORDER_MAX_CLIPS", 200)),
+)
+imu_trigger = ImuTrigger(
+    accel_threshold=float(os.getenv("IMU_ACCEL_THRESHOLD", 4.0)),
+    tilt_deg=float(os.getenv("IMU_TILT_DEG", 35.0)),
+    tilt_hysteresis=float(os.getenv("IMU_TILT_HYSTERESIS_DEG", 5.0)),
+    jerk_threshold=float(os.getenv("IMU_JERK_THRESHOLD", 50.0)),
+    cooldown=float(os.getenv("IMU_TRIGGER_COOLDOWN", 5.0)),
+)
+
+bringup = BringUp(started_at=STARTED_AT)
+
 @app.on_event("startup")
 async def startup_tasks():
-    app.state._telemetry_task = asyncio.create_task(telemetry_broadcaster())
+    # Only schedule work here: uvicorn doesn't open the port until startup returns
+    tasks = [
+        asyncio.create_task(bring_up_hardware()),
+        asyncio.create_task(telemetry_broadcaster()),
+        asyncio.create_task(metrics.monitor_event_loop_lag()),
+    ]
+    if RECORDER_FPS > 0:
+        tasks.append(asyncio.create_task(recorder_capture_loop()))
+    if IMU_TRIGGER_HZ > 0:
+        tasks.append(asyncio.create_task(imu_watch_loop()))
+    app.state._background_tasks = tasks
 
 @app.on_event("shutdown")
 async def shutdown_tasks():
-    app.state._telemetry_task.cancel()
+    for t in app.state._background_tasks:
+        t.cancel()
     for c in clients:
         await c.close()
+    await asyncio.to_thread(recorder.close)
+
+async def bring_up_hardware():
+    # Camera, I2C sensors and the serial link come up concurrently in worker threads
+    _, _, _, xbee_ok = await asyncio.gather(
+        bring_up_camera(),
+        bringup.start("lsm6dsox", lsm6dsox.init),
+        bringup.start("bmp388", bmp388.init),
+        bringup.start("xbee", xbee.init),
+    )
+    # only listen when a radio is actually attached, not merely when pyserial imports
+    if xbee_ok and xbee.port_available():
+        app.state._background_tasks.append(asyncio.create_task(xbee_listener()))
+
+async def bring_up_camera():
+    ok = await bringup.start("camera", camera.init)
+    # one test capture so boot-to-first-frame is recorded even with RECORDER_FPS=0
+    if ok and await asyncio.to_thread(camera.capture_frame) is not None:
+        bringup.mark("first_frame")
+    return ok
 
 async def telemetry_broadcaster():
     # Periodically read sensors and send telemetry to connected websocket clients
     while True:
-        data = {
-            "imu": lsm6dsox.read_imu(),
-            "barometer": bmp388.read_pressure_temp(),
-        }
-        for ws in list(clients):
-            try:
-                await ws.send_json({"type": "telemetry", "payload": data})
-            except Exception:
-                try:
-                    await ws.close()
-                except Exception:
-                    pass
-                clients.discard(ws)
+        imu, baro = await asyncio.gather(
+            asyncio.to_thread(lsm6dsox.read_imu),
+            asyncio.to_thread(bmp388.read_pressure_temp),
+        )
+        data = {"imu": imu, "barometer": baro}
+        if "error" not in imu:
+            bringup.mark("first_telemetry")
+        if clients:
+            # only time real fan-outs; empty ticks would drag the histogram towards zero
+            with metrics.WEBSOCKET_FANOUT_SECONDS.time():
+                for ws in list(clients):
+                    try:
+                        await ws.send_json({"type": "telemetry", "payload": data})
+                    except Exception:
+                        try:
+                            await ws.close()
+                        except Exception:
+                            pass
+                        clients.discard(ws)
+        metrics.WEBSOCKET_CLIENTS.set(len(clients))
         await asyncio.sleep(1.0)
 
+async def recorder_capture_loop():
+    # Feed the ring buffer from Picamera2 only (never the slow rpicam-still fallback);
+    # capture runs in a worker thread so the loop stays responsive
+    interval = 1.0 / RECORDER_FPS
+    delay = interval
+    while True:
+        started = time.monotonic()
+        frame = await asyncio.to_thread(camera.capture_frame)
+        if frame is not None:
+            bringup.mark("first_frame")
+            recorder.add_frame(frame)
+            metrics.FRAMES_PER_SECOND.labels(stream="recorder").tick()
+            delay = interval
+        else:
+            recorder.poll()
+            # camera not up (yet): back off instead of polling at full rate
+            delay = min(delay * 2, RECORDER_MAX_BACKOFF)
+        await asyncio.sleep(max(0.0, delay - (time.monotonic() - started)))
+
+async def imu_watch_loop():
+    # Sample the IMU faster than telemetry so short bumps and jerks are not missed
+    interval = 1.0 / IMU_TRIGGER_HZ
+    while True:
+        reason = imu_trigger.check(await asyncio.to_thread(lsm6dsox.read_imu))
+        if reason:
+            recorder.trigger(f"imu: {reason}")
+        await asyncio.sleep(interval)
+
+async def xbee_listener():
+    # "RECORD" or "RECORD <note>" received over the radio triggers a clip
+    while True:
+        for line in await asyncio.to_thread(xbee.read_commands, (XBEE_RECORD_COMMAND,)):
+            cmd, _, note = line.partition(" ")
+            if cmd.upper() == XBEE_RECORD_COMMAND:
+                recorder.trigger(f"xbee: {note}" if note else "xbee")
+
 @app.get("/api/sensors")
 async def get_sensors():
     try:
-        imu = lsm6dsox.read_imu()
-        baro = bmp388.read_pressure_temp()
+        imu, baro = await asyncio.gather(
+            asyncio.to_thread(lsm6dsox.read_imu),
+            asyncio.to_thread(bmp388.read_pressure_temp),
+        )
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
     return {"imu": imu, "barometer": baro}
 
+@app.get("/api/status")
+async def get_status():
+    return bringup.status()
+
 @app.get("/api/camera/snapshot")
 async def get_snapshot():
-    image_bytes = camera.capture_jpeg()
+    image_bytes = await asyncio.to_thread(camera.capture_jpeg)
+    if image_bytes is not None:
+        bringup.mark("first_frame")
     if image_bytes is None:
         raise HTTPException(status_code=500, detail="Camera capture failed")
-    return StreamingResponse(io.BytesIO(image_bytes), media_type="image/jpeg")
+    return StreamingResponse(timed_frame_body(image_bytes, "snapshot"), media_type="image/jpeg")
+
+async def timed_frame_body(frame, stream):
+    # The generator resumes once the server has sent the chunk, so this times the send
+    started = time.perf_counter()
+    yield frame
+    metrics.FRAME_SEND_SECONDS.labels(stream=stream).observe(time.perf_counter() - started)
 
 @app.post("/api/xbee/send")
 async def send_xbee(payload: dict):
     cmd = payload.get("command")
     if not cmd:
         raise HTTPException(status_code=400, detail="No command provided")
-    ok = xbee.send_command(cmd)
+    ok = await asyncio.to_thread(xbee.send_command, cmd)
     return {"ok": ok}
 
+@app.post("/api/recorder/trigger")
+async def trigger_recording(payload: dict = None):
+    reason = (payload or {}).get("reason") or "api"
+    result = recorder.trigger(reason)
+    camera_up = bringup.subsystems.get("camera", {}).get("state") == "ready"
+    # the event is still tracked in case the camera comes up during post-roll;
+    # "frames" is the pre-roll captured so far, and clips with none are never written
+    result["status"] = "recording" if RECORDER_FPS > 0 and camera_up else "no camera"
+    return result
+
+@app.get("/api/recorder/status")
+async def recorder_status():
+    return {**recorder.status(), "fps": metrics.FRAMES_PER_SECOND.labels(stream="recorder").value}
+
+@app.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/debug/profile")
+async def get_profile(seconds: float = 5.0):
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling disabled (set PROFILING_ENABLED=1)")
+    stacks = await asyncio.to_thread(metrics.sample_stacks, min(seconds, 60.0))
+    return PlainTextResponse(stacks)
+
 @app.websocket('/ws/telemetry')
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
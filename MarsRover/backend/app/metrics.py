@@ -0,0 +1,280 @@
+"""Lightweight Prometheus-style metrics and an on-demand sampling profiler.
+
+Dependency-free and cheap enough to leave on during a run: an observation is a
+bisect plus a few additions under a per-series lock. `render()` produces the
+Prometheus text exposition format served at `/metrics`.
+"""
+
+import asyncio
+import bisect
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter as _StackCounter, deque
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+def _format_value(v):
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Timer:
+    """Context manager observing the elapsed wall time into a histogram series."""
+
+    __slots__ = ("_series", "_start")
+
+    def __init__(self, series):
+        self._series = series
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._series.observe(time.perf_counter() - self._start)
+        return False
+
+
+class _CounterSeries:
+    def __init__(self, metric):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name, labels):
+        return [(name + "_total", labels, self.value)]
+
+
+class _GaugeSeries:
+    def __init__(self, metric):
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self, name, labels):
+        return [(name, labels, self.value)]
+
+
+class _HistogramSeries:
+    def __init__(self, metric):
+        self._bounds = metric.buckets
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self._bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        i = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        return _Timer(self)
+
+    def samples(self, name, labels):
+        with self._lock:
+            counts, total, count = list(self._counts), self.sum, self.count
+        out = []
+        cumulative = 0
+        for bound, c in zip(self._bounds + (float("inf"),), counts):
+            cumulative += c
+            out.append((name + "_bucket", labels + (("le", _format_value(float(bound))),), cumulative))
+        out.append((name + "_sum", labels, total))
+        out.append((name + "_count", labels, count))
+        return out
+
+
+class _RateSeries:
+    """Events per second over a sliding window, e.g. measured frames per second."""
+
+    def __init__(self, metric):
+        self._window = metric.window
+        self._ticks = deque()
+        self._lock = threading.Lock()
+
+    def tick(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._ticks.append(now)
+            self._prune(now)
+
+    def _prune(self, now):
+        while self._ticks and now - self._ticks[0] > self._window:
+            self._ticks.popleft()
+
+    @property
+    def value(self):
+        with self._lock:
+            self._prune(time.monotonic())
+            return len(self._ticks) / self._window
+
+    def samples(self, name, labels):
+        return [(name, labels, round(self.value, 2))]
+
+
+class _Metric:
+    """Base for all metric types; `registry` defaults to the one served at /metrics."""
+
+    type = None
+    series_class = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+        with _registry_lock:
+            (_registry if registry is None else registry).append(self)
+
+    def labels(self, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(key, self.series_class(self))
+        return series
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for key, series in list(self._series.items()):
+            for name, labels, value in series.samples(self.name, tuple(zip(self.labelnames, key))):
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    type = "counter"
+    series_class = _CounterSeries
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    type = "gauge"
+    series_class = _GaugeSeries
+
+    def set(self, value):
+        self._default.set(value)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+    series_class = _HistogramSeries
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+
+class Rate(_Metric):
+    """Gauge reporting ticks per second over the last `window` seconds."""
+
+    type = "gauge"
+    series_class = _RateSeries
+
+    def __init__(self, name, documentation, labelnames=(), window=5.0, registry=None):
+        self.window = window
+        super().__init__(name, documentation, labelnames, registry)
+
+    def tick(self, now=None):
+        self._default.tick(now)
+
+
+def render(registry=None):
+    """Return all metrics in `registry` (default: the global one) in Prometheus text format."""
+    with _registry_lock:
+        metrics = list(_registry if registry is None else registry)
+    lines = []
+    for m in metrics:
+        lines.extend(m.render())
+    return "\n".join(lines) + "\n"
+
+
+async def monitor_event_loop_lag(interval=0.5):
+    """Record how late the event loop wakes up from a fixed sleep."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - start - interval)
+        EVENT_LOOP_LAG_SECONDS.observe(lag)
+
+
+def sample_stacks(seconds=5.0, interval=0.005, limit=30):
+    """Sample every thread's stack for `seconds` and return the hottest stacks.
+
+    Output is in collapsed-stack format (`frame;frame;frame count`), one stack per
+    line and most frequent first, so it can be fed straight to flamegraph.pl.
+    """
+    own = threading.get_ident()
+    stacks = _StackCounter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for tid, frame in sys._current_frames().items():
+            if tid == own:
+                continue
+            # skip source-line lookup; walk_stack yields innermost frame first
+            summary = traceback.StackSummary.extract(traceback.walk_stack(frame), lookup_lines=False)
+            stacks[";".join(
+                f"{fs.name} ({os.path.basename(fs.filename)}:{fs.lineno})"
+                for fs in reversed(summary)
+            )] += 1
+        time.sleep(interval)
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common(limit))
+
+
+# Metrics shared by the backend and the drivers
+CAMERA_CAPTURE_SECONDS = Histogram(
+    "camera_capture_seconds", "Time to grab one frame from the camera", ("source",))
+CAMERA_ENCODE_SECONDS = Histogram(
+    "camera_encode_seconds", "Time to JPEG-encode one frame")
+FRAMES_PER_SECOND = Rate(
+    "frames_per_second", "Measured frames per second", ("stream",))
+FRAME_SEND_SECONDS = Histogram(
+    "frame_send_seconds", "Time to send one encoded frame to a client", ("stream",))
+I2C_READ_SECONDS = Histogram(
+    "i2c_read_seconds", "I2C sensor read latency", ("sensor",))
+WEBSOCKET_FANOUT_SECONDS = Histogram(
+    "websocket_fanout_seconds", "Time to send one telemetry message to every WebSocket client")
+WEBSOCKET_CLIENTS = Gauge(
+    "websocket_clients", "Connected telemetry WebSocket clients")
+XBEE_BYTES = Counter(
+    "xbee_bytes", "Bytes moved over the XBee serial link", ("direction",))
+XBEE_ROUND_TRIP_SECONDS = Histogram(
+    "xbee_round_trip_seconds", "Time from sending an XBee command to the first response byte")
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds", "How late the asyncio event loop wakes from a sleep")
+SUBSYSTEM_READY_SECONDS = Gauge(
+    "subsystem_ready_seconds", "Seconds from process start until a subsystem finished bring-up", ("subsystem",))
+STARTUP_MILESTONE_SECONDS = Gauge(
+    "startup_milestone_seconds", "Seconds from process start until first frame / first telemetry", ("milestone",))
@@ -0,0 +1,289 @@
+"""Event-triggered video recording from an in-memory ring buffer of JPEG frames.
+
+The capture loop pushes every encoded frame into `EventRecorder.add_frame`. When a
+trigger fires (IMU event, API call or XBee command) the frames already buffered
+for the pre-roll window are kept, the following post-roll frames are appended, and
+the finished clip is handed to a background writer thread so disk I/O never runs
+on the capture or streaming path.
+
+Clips are written as concatenated JPEGs (`<id>.mjpeg`, playable with ffplay/VLC)
+next to a `<id>.json` sidecar describing the trigger.
+"""
+
+import itertools
+import json
+import math
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+STANDARD_GRAVITY = 9.80665
+
+
+class FrameRingBuffer:
+    """Most recent encoded frames, bounded by total bytes and by age."""
+
+    def __init__(self, max_bytes, max_seconds):
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self._frames = deque()
+        self._bytes = 0
+
+    def append(self, frame, ts):
+        self._frames.append((ts, frame))
+        self._bytes += len(frame)
+        # always keep the newest frame, even if it alone exceeds the byte budget
+        while len(self._frames) > 1 and (
+            self._bytes > self.max_bytes or ts - self._frames[0][0] > self.max_seconds
+        ):
+            _, old = self._frames.popleft()
+            self._bytes -= len(old)
+
+    def since(self, ts):
+        """Return buffered `(ts, frame)` pairs captured at or after `ts`."""
+        return [f for f in self._frames if f[0] >= ts]
+
+    def stats(self):
+        span = self._frames[-1][0] - self._frames[0][0] if self._frames else 0.0
+        return {
+            "frames": len(self._frames),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "seconds": round(span, 2),
+        }
+
+
+class EventRecorder:
+    """Ring buffer plus pre/post-roll clip extraction and a background writer."""
+
+    def __init__(self, out_dir, max_bytes, max_seconds=30.0, pre_roll=10.0,
+                 post_roll=10.0, max_event_seconds=60.0, max_event_bytes=None,
+                 max_disk_bytes=1024 * 1024 * 1024, max_clips=200):
+        self.out_dir = out_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.max_clips = max_clips
+        self.pre_roll = pre_roll
+        self.post_roll = post_roll
+        self.max_event_seconds = max_event_seconds
+        # Post-trigger frames are held in RAM until written, so they get their own
+        # budget (by default the buffer's); pre-roll frames are shared with the buffer.
+        self.max_event_bytes = max_bytes if max_event_bytes is None else max_event_bytes
+        self.buffer = FrameRingBuffer(max_bytes, max_seconds)
+        self.clips = deque(maxlen=20)
+        self._event = None
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._writer = None
+        self._seq = itertools.count(1)  # keeps ids unique within a second
+
+    def add_frame(self, frame, ts=None):
+        """Buffer one encoded frame; closes the active event once post-roll is over.
+
+        An event whose post-trigger frames would exceed `max_event_bytes` is closed
+        early and marked as truncated.
+        """
+        ts = time.monotonic() if ts is None else ts
+        full = None
+        with self._lock:
+            self.buffer.append(frame, ts)
+            ev = self._event
+            if ev is not None:
+                if ev["bytes"] + len(frame) > self.max_event_bytes:
+                    ev["truncated"] = True
+                    full, self._event = ev, None
+                else:
+                    ev["frames"].append((ts, frame))
+                    ev["bytes"] += len(frame)
+        if full is not None:
+            self._submit(full)
+        else:
+            self.poll(ts)
+
+    def trigger(self, reason, ts=None):
+        """Start a clip, or extend the active one, and return its summary."""
+        ts = time.monotonic() if ts is None else ts
+        with self._lock:
+            ev = self._event
+            if ev is None:
+                ev = self._event = {
+                    "id": time.strftime("%Y%m%d-%H%M%S") + f"-{next(self._seq):04d}",
+                    "reasons": [],
+                    "started": time.time(),
+                    "triggered_at": ts,
+                    "end": ts,
+                    "frames": self.buffer.since(ts - self.pre_roll),
+                    "truncated": False,
+                }
+                ev["bytes"] = 0  # post-trigger bytes only
+            ev["reasons"].append(reason)
+            # retriggers extend the post-roll, capped so a stuck trigger can't grow forever
+            ev["end"] = max(ev["end"], min(ts + self.post_roll,
+                                           ev["triggered_at"] + self.max_event_seconds))
+            return {"id": ev["id"], "reasons": list(ev["reasons"]), "frames": len(ev["frames"]),
+                    "remaining_s": round(max(0.0, ev["end"] - ts), 2)}
+
+    def poll(self, ts=None):
+        """Hand the active event to the writer if its post-roll has elapsed."""
+        ts = time.monotonic() if ts is None else ts
+        with self._lock:
+            ev = self._event
+            if ev is None or ts < ev["end"]:
+                return
+            self._event = None
+        self._submit(ev)
+
+    def status(self):
+        with self._lock:
+            ev = self._event
+            active = None
+            if ev is not None:
+                active = {"id": ev["id"], "reasons": list(ev["reasons"]), "frames": len(ev["frames"])}
+            return {
+                "buffer": self.buffer.stats(),
+                "pre_roll_s": self.pre_roll,
+                "post_roll_s": self.post_roll,
+                "active": active,
+                "pending_writes": self._queue.qsize(),
+                "clips": list(self.clips),
+            }
+
+    def close(self, timeout=10.0):
+        """Flush the active event (if any) and wait for pending writes."""
+        with self._lock:
+            ev, self._event = self._event, None
+        if ev is not None:
+            self._submit(ev)
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join(timeout)
+            self._writer = None
+
+    def _submit(self, ev):
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(target=self._write_loop, name="clip-writer", daemon=True)
+            self._writer.start()
+        self._queue.put(ev)
+
+    def _write_loop(self):
+        while True:
+            ev = self._queue.get()
+            if ev is None:
+                return
+            if not ev["frames"]:
+                # nothing was captured (camera down or not started); don't leave empty files
+                print("recorder: skipping clip", ev["id"], "with no frames")
+                continue
+            try:
+                self.clips.append(self._write_clip(ev))
+            except Exception as e:
+                print("recorder write error:", e)
+
+    def _write_clip(self, ev):
+        os.makedirs(self.out_dir, exist_ok=True)
+        frames = ev["frames"]
+        video_path = os.path.join(self.out_dir, ev["id"] + ".mjpeg")
+        with open(video_path, "wb") as f:
+            for _, frame in frames:
+                f.write(frame)
+        duration = frames[-1][0] - frames[0][0] if frames else 0.0
+        meta = {
+            "id": ev["id"],
+            "reasons": ev["reasons"],
+            "started": ev["started"],
+            "frames": len(frames),
+            "duration_s": round(duration, 3),
+            "pre_roll_s": round(ev["triggered_at"] - frames[0][0], 3) if frames else 0.0,
+            "truncated": ev["truncated"],
+            "file": os.path.basename(video_path),
+        }
+        with open(os.path.join(self.out_dir, ev["id"] + ".json"), "w") as f:
+            json.dump(meta, f, indent=2)
+        self._prune_clips(keep=ev["id"])
+        return meta
+
+    def _prune_clips(self, keep):
+        """Delete the oldest clips until `out_dir` is within the size and count caps."""
+        clips = []
+        for name in os.listdir(self.out_dir):
+            if name.endswith(".mjpeg"):
+                path = os.path.join(self.out_dir, name)
+                st = os.stat(path)
+                clips.append((st.st_mtime, name[:-len(".mjpeg")], st.st_size))
+        clips.sort()
+        total = sum(size for _, _, size in clips)
+        count = len(clips)
+        for _, clip_id, size in clips:
+            if total <= self.max_disk_bytes and count <= self.max_clips:
+                break
+            if clip_id == keep:
+                continue
+            for ext in (".mjpeg", ".json"):
+                try:
+                    os.remove(os.path.join(self.out_dir, clip_id + ext))
+                except OSError:
+                    pass
+            total -= size
+            count -= 1
+
+
+class ImuTrigger:
+    """Flags bump, tilt and jerk events from successive IMU samples.
+
+    Thresholds of 0 disable the corresponding check. Tilt assumes the IMU is mounted
+    with +Z pointing up when the rover is level. Tilt fires once when it crosses
+    `tilt_deg` and re-arms only after dropping below `tilt_deg - tilt_hysteresis`,
+    so a rover parked on a slope doesn't keep retriggering.
+    """
+
+    def __init__(self, accel_threshold=4.0, tilt_deg=35.0, jerk_threshold=50.0, cooldown=5.0,
+                 tilt_hysteresis=5.0):
+        self.accel_threshold = accel_threshold
+        self.tilt_deg = tilt_deg
+        self.tilt_hysteresis = tilt_hysteresis
+        self.jerk_threshold = jerk_threshold
+        self.cooldown = cooldown
+        self._prev = None
+        self._last_fired = None
+        self._tilted = False
+
+    def check(self, imu, ts=None):
+        """Return a reason string if `imu` (a `read_imu()` dict) is an event, else None."""
+        ts = time.monotonic() if ts is None else ts
+        accel = imu.get("accel") if isinstance(imu, dict) else None
+        if not accel or len(accel) != 3:
+            return None
+        ax, ay, az = accel
+        mag = math.sqrt(ax * ax + ay * ay + az * az)
+
+        tilt_crossed = None
+        if self.tilt_deg and mag > 0:
+            tilt = math.degrees(math.acos(max(-1.0, min(1.0, az / mag))))
+            if self._tilted:
+                if tilt < self.tilt_deg - self.tilt_hysteresis:
+                    self._tilted = False
+            elif tilt > self.tilt_deg:
+                self._tilted = True
+                tilt_crossed = tilt
+
+        reason = None
+        if self.accel_threshold and abs(mag - STANDARD_GRAVITY) > self.accel_threshold:
+            reason = f"bump |a|={mag:.2f} m/s^2"
+        elif tilt_crossed is not None:
+            reason = f"tilt {tilt_crossed:.1f} deg"
+        if reason is None and self.jerk_threshold and self._prev is not None:
+            pts, (px, py, pz) = self._prev
+            dt = ts - pts
+            if dt > 0:
+                jerk = math.sqrt((ax - px) ** 2 + (ay - py) ** 2 + (az - pz) ** 2) / dt
+                if jerk > self.jerk_threshold:
+                    reason = f"jerk {jerk:.1f} m/s^3"
+        self._prev = (ts, (ax, ay, az))
+
+        if reason is None:
+            return None
+        if self._last_fired is not None and ts - self._last_fired < self.cooldown:
+            return None
+        self._last_fired = ts
+        return reason
@@ -1,20 +1,62 @@
-"""BMP388 wrapper with graceful fallback"""
+"""BMP388 wrapper with graceful fallback
 
-try:
+Hardware libraries are imported on first use rather than at module import.
+"""
+
+import threading
+
+from app import metrics
+
+hw = None  # unknown until the hardware libraries have been imported
+_sensor = None
+_lock = threading.Lock()
+
+
+def _load():
+    global hw
+    if hw is None:
+        try:
+            import board  # noqa: F401
+            import busio  # noqa: F401
+            import adafruit_bmp3xx  # noqa: F401
+            hw = True
+        except Exception:
+            hw = False
+    return hw
+
+
+def _open_sensor():
     import board
     import busio
     import adafruit_bmp3xx
-    hw = True
-except Exception:
-    hw = False
+    return adafruit_bmp3xx.BMP3XX_I2C(busio.I2C(board.SCL, board.SDA))
+
+
+def init():
+    """Import the hardware libraries and open the sensor.
+
+    Returns False when the libraries are missing (fake data is served instead);
+    raises if they are present but the sensor cannot be opened.
+    """
+    global _sensor
+    with _lock:
+        if _load() and _sensor is None:
+            _sensor = _open_sensor()
+        return hw
 
 
 def read_pressure_temp():
-    if not hw:
-        return {"pressure_hpa": 1013.25, "temperature_c": 20.0}
-    try:
-        i2c = busio.I2C(board.SCL, board.SDA)
-        sensor = adafruit_bmp3xx.BMP3XX_I2C(i2c)
-        return {"pressure_hpa": sensor.pressure, "temperature_c": sensor.temperature}
-    except Exception as e:
-        return {"error": str(e)}
+    global _sensor
+    with _lock:
+        if not _load():
+            return {"pressure_hpa": 1013.25, "temperature_c": 20.0}
+        try:
+            with metrics.I2C_READ_SECONDS.labels(sensor="bmp388").time():
+                if _sensor is None:
+                    _sensor = _open_sensor()
+                reading = {"pressure_hpa": _sensor.pressure, "temperature_c": _sensor.temperature}
+            return reading
+        except Exception as e:
+            # reopen the bus on the next read
+            _sensor = None
+            return {"error": str(e)}
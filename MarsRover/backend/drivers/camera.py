@@ -7,12 +7,29 @@ import os
 import shutil
 import subprocess
 import tempfile
+import threading
+
+from app import metrics
 
 _camera = None
+_camera_lock = threading.Lock()
+
+
+def init():
+    """Bring Picamera2 up ahead of the first capture. Returns True if it is running."""
+    return _ensure_camera() is not None
 
 
 def _ensure_camera():
     """Return an initialized Picamera2 instance or None if unavailable."""
+    if _camera is not None:
+        return _camera
+    # serialize bring-up so concurrent callers don't open the camera twice
+    with _camera_lock:
+        return _open_camera()
+
+
+def _open_camera():
     global _camera
     if _camera is not None:
         return _camera
@@ -44,6 +61,11 @@ def _ensure_camera():
 
 def _encode_image_to_jpeg_bytes(im):
     """Encode a numpy array image to JPEG bytes using cv2 or PIL."""
+    with metrics.CAMERA_ENCODE_SECONDS.time():
+        return _encode_jpeg(im)
+
+
+def _encode_jpeg(im):
     try:
         import cv2
         ret, buf = cv2.imencode('.jpg', im)
@@ -63,6 +85,27 @@ def _encode_image_to_jpeg_bytes(im):
         return None
 
 
+def _capture_picamera2(cam):
+    with metrics.CAMERA_CAPTURE_SECONDS.labels(source="picamera2").time():
+        im = cam.capture_array()
+    return _encode_image_to_jpeg_bytes(im)
+
+
+def capture_frame():
+    """Capture a JPEG from an already running Picamera2, or return None.
+
+    Never opens the camera or falls back to rpicam-still, so it is cheap enough to
+    call from a periodic loop without starving snapshot requests.
+    """
+    cam = _camera
+    if cam is None:
+        return None
+    try:
+        return _capture_picamera2(cam)
+    except Exception:
+        return None
+
+
 def capture_jpeg():
     """Capture a JPEG from Picamera2 or fall back to rpicam-still.
 
@@ -72,8 +115,7 @@ def capture_jpeg():
     cam = _ensure_camera()
     if cam is not None:
         try:
-            im = cam.capture_array()
-            return _encode_image_to_jpeg_bytes(im)
+            return _capture_picamera2(cam)
         except Exception:
             # continue to fallback
             pass
@@ -90,7 +132,8 @@ def capture_jpeg():
             ]
             for cmd in candidates:
                 try:
-                    proc = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, timeout=10)
+                    with metrics.CAMERA_CAPTURE_SECONDS.labels(source="rpicam-still").time():
+                        proc = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, timeout=10)
                 except subprocess.TimeoutExpired:
                     # command took too long; try next candidate
                     continue
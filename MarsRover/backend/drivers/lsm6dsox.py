@@ -1,25 +1,65 @@
-"""LSM6DSOX wrapper with graceful fallback when hardware not available"""
+"""LSM6DSOX wrapper with graceful fallback when hardware not available
 
-import os
+The Adafruit/Blinka libraries are imported on first use rather than at module
+import, so the backend can start serving before the I2C stack is loaded.
+"""
 
-try:
+import threading
+
+from app import metrics
+
+hw = None  # unknown until the hardware libraries have been imported
+_sensor = None
+_lock = threading.Lock()
+
+
+def _load():
+    global hw
+    if hw is None:
+        try:
+            import board  # noqa: F401
+            import busio  # noqa: F401
+            import adafruit_lsm6ds.lsm6dsox  # noqa: F401
+            hw = True
+        except Exception:
+            hw = False
+    return hw
+
+
+def _open_sensor():
     import board
     import busio
-    from adafruit_lsm6ds import LSM6DSOX
-    hw = True
-except Exception:
-    hw = False
+    from adafruit_lsm6ds.lsm6dsox import LSM6DSOX
+    return LSM6DSOX(busio.I2C(board.SCL, board.SDA))
+
+
+def init():
+    """Import the hardware libraries and open the sensor.
+
+    Returns False when the libraries are missing (fake data is served instead);
+    raises if they are present but the sensor cannot be opened.
+    """
+    global _sensor
+    with _lock:
+        if _load() and _sensor is None:
+            _sensor = _open_sensor()
+        return hw
 
 
 def read_imu():
-    if not hw:
-        # Return fake data for development
-        return {"accel": [0.0, 0.0, 9.81], "gyro": [0.0, 0.0, 0.0]}
-    try:
-        i2c = busio.I2C(board.SCL, board.SDA)
-        sensor = LSM6DSOX(i2c)
-        accel = sensor.acceleration
-        gyro = sensor.gyro
-        return {"accel": accel, "gyro": gyro}
-    except Exception as e:
-        return {"error": str(e)}
+    global _sensor
+    with _lock:
+        if not _load():
+            # Return fake data for development
+            return {"accel": [0.0, 0.0, 9.81], "gyro": [0.0, 0.0, 0.0]}
+        try:
+            with metrics.I2C_READ_SECONDS.labels(sensor="lsm6dsox").time():
+                if _sensor is None:
+                    _sensor = _open_sensor()
+                accel = _sensor.acceleration
+                gyro = _sensor.gyro
+            return {"accel": accel, "gyro": gyro}
+        except Exception as e:
+            # reopen the bus on the next read
+            _sensor = None
+            return {"error": str(e)}
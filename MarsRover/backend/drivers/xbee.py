@@ -1,32 +1,184 @@
-"""Simple XBee serial wrapper. Configure SERIAL_PORT and SERIAL_BAUD via env vars."""
+"""Simple XBee serial wrapper. Configure SERIAL_PORT and SERIAL_BAUD via env vars.
+
+pyserial is imported on first use rather than at module import.
+"""
 import os
+import queue
+import threading
 import time
 
-try:
-    import serial
-    hw = True
-except Exception:
-    hw = False
+from app import metrics
+
+serial = None
+hw = None  # unknown until pyserial has been imported
 
 SERIAL_PORT = os.getenv('SERIAL_PORT', '/dev/serial0')
 SERIAL_BAUD = int(os.getenv('SERIAL_BAUD', 9600))
+PORT_TIMEOUT = 0.5   # readline timeout on the shared port
+REPLY_WINDOW = 0.1   # how long a send waits for the XBee to answer
+
+# One Serial handle is shared by senders and the command listener so replies are
+# never read by a second handle on the same tty.
+_port = None
+_port_lock = threading.Lock()   # guards open/close and writes
+_send_lock = threading.Lock()   # one command (and its reply) at a time
+_replies = queue.Queue(maxsize=100)
+_listening = False
+_read_failing = False  # report read errors once per outage, not every poll
+
+
+def _load():
+    global hw, serial
+    if hw is None:
+        try:
+            import serial as _serial
+            serial = _serial
+            hw = True
+        except Exception:
+            hw = False
+    return hw
+
+
+def init() -> bool:
+    """Import pyserial and check the serial port exists.
+
+    Returns False when pyserial is missing (sends are emulated); raises if it is
+    present but SERIAL_PORT does not exist.
+    """
+    if _load() and not port_available():
+        raise FileNotFoundError(f"serial port {SERIAL_PORT} not found")
+    return hw
+
+
+def port_available() -> bool:
+    """True if pyserial is installed and SERIAL_PORT exists."""
+    return bool(_load()) and os.path.exists(SERIAL_PORT)
+
+
+def _open_port():
+    global _port
+    with _port_lock:
+        if _port is None:
+            _port = serial.Serial(SERIAL_PORT, SERIAL_BAUD, timeout=PORT_TIMEOUT, write_timeout=2.0)
+        return _port
+
+
+def _close_port():
+    global _port
+    with _port_lock:
+        if _port is not None:
+            try:
+                _port.close()
+            except Exception:
+                pass
+            _port = None
 
 
 def send_command(cmd: str, timeout: float = 2.0) -> bool:
-    """Send a simple text command over serial to XBee. Returns True on success."""
-    if not hw:
+    """Send a simple text command over serial to XBee. Returns True on success.
+
+    `timeout` bounds how long to wait for another send to release the port.
+    """
+    if not _load():
         # Emulate send
         print(f"[xbee-emulator] send: {cmd}")
         return True
+    if not _send_lock.acquire(timeout=timeout):
+        print("XBee send error: port busy")
+        return False
     try:
-        with serial.Serial(SERIAL_PORT, SERIAL_BAUD, timeout=timeout) as ser:
-            ser.write(cmd.encode('utf-8') + b"\n")
-            # Optionally read a response
-            time.sleep(0.1)
-            if ser.in_waiting:
-                resp = ser.read(ser.in_waiting)
-                print("xbee resp:", resp)
+        ser = _open_port()
+        # drop replies to earlier sends that arrived after their window closed
+        while not _replies.empty():
+            _replies.get_nowait()
+        data = cmd.encode('utf-8') + b"\n"
+        with _port_lock:
+            ser.write(data)
+        sent = time.perf_counter()
+        metrics.XBEE_BYTES.labels(direction="tx").inc(len(data))
+        # Optionally read a response
+        resp = _collect_reply(ser, sent)
+        if resp:
+            print("xbee resp:", resp)
         return True
     except Exception as e:
         print("XBee send error:", e)
+        _close_port()
         return False
+    finally:
+        _send_lock.release()
+
+
+def _collect_reply(ser, sent):
+    """Gather the response to a command written at `sent`, timing the first byte."""
+    deadline = sent + REPLY_WINDOW
+    if _listening:
+        # the listener owns reads; it routes non-command lines to us
+        lines = []
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                line = _replies.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if not lines:
+                metrics.XBEE_ROUND_TRIP_SECONDS.observe(time.perf_counter() - sent)
+            lines.append(line)
+        return b"\n".join(lines)
+
+    # poll so the first byte gives a round-trip time
+    while not ser.in_waiting and time.perf_counter() < deadline:
+        time.sleep(0.005)
+    if not ser.in_waiting:
+        return b""
+    metrics.XBEE_ROUND_TRIP_SECONDS.observe(time.perf_counter() - sent)
+    time.sleep(max(0.0, deadline - time.perf_counter()))
+    resp = ser.read(ser.in_waiting)
+    metrics.XBEE_BYTES.labels(direction="rx").inc(len(resp))
+    return resp
+
+
+def read_commands(commands=("RECORD",)) -> list:
+    """Return received lines whose first word is one of `commands`.
+
+    Blocks for up to the port timeout waiting for the first line. Any other line is
+    treated as a reply and handed to a `send_command` waiting for it. Returns an
+    empty list when no hardware is present or the port cannot be opened.
+    """
+    global _listening, _read_failing
+    if not _load():
+        return []
+    if not os.path.exists(SERIAL_PORT):
+        # no radio attached (e.g. a dev machine, or the adapter was unplugged)
+        _listening = False
+        _close_port()
+        time.sleep(PORT_TIMEOUT)
+        return []
+    try:
+        ser = _open_port()
+        _listening = True
+        _read_failing = False
+        found = []
+        line = ser.readline()
+        while line:
+            metrics.XBEE_BYTES.labels(direction="rx").inc(len(line))
+            text = line.decode('utf-8', errors='replace').strip()
+            if text and text.split(" ", 1)[0].upper() in commands:
+                found.append(text)
+            elif text:
+                try:
+                    _replies.put_nowait(line.rstrip(b"\r\n"))
+                except queue.Full:
+                    pass
+            line = ser.readline() if ser.in_waiting else b""
+        return found
+    except Exception as e:
+        if not _read_failing:
+            print("XBee read error:", e)
+        _read_failing = True
+        _listening = False
+        _close_port()
+        time.sleep(PORT_TIMEOUT)
+        return []
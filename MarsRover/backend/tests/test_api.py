@@ -10,3 +10,47 @@ async def test_sensors_endpoint():
         data = r.json()
         assert "imu" in data
         assert "barometer" in data
+
+@pytest.mark.asyncio
+async def test_recorder_trigger_endpoint():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        r = await ac.post("/api/recorder/trigger", json={"reason": "test"})
+        assert r.status_code == 200
+        assert "test" in r.json()["reasons"]
+        # no camera bring-up under the test client, so nothing can be recorded
+        assert r.json()["status"] == "no camera"
+        assert r.json()["frames"] == 0
+        r = await ac.get("/api/recorder/status")
+        assert r.status_code == 200
+        assert r.json()["active"]["id"]
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        await ac.get("/api/sensors")
+        r = await ac.get("/metrics")
+        assert r.status_code == 200
+        assert "# TYPE event_loop_lag_seconds histogram" in r.text
+        assert "xbee_bytes" in r.text
+
+@pytest.mark.asyncio
+async def test_status_endpoint():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        r = await ac.get("/api/status")
+        assert r.status_code == 200
+        data = r.json()
+        assert "subsystems" in data
+        assert "milestones" in data
+
+@pytest.mark.asyncio
+async def test_snapshot_send_is_timed(monkeypatch):
+    from app import metrics
+    from drivers import camera
+    monkeypatch.setattr(camera, "capture_jpeg", lambda: b"\xff\xd8jpeg\xff\xd9")
+    series = metrics.FRAME_SEND_SECONDS.labels(stream="snapshot")
+    before = series.count
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        r = await ac.get("/api/camera/snapshot")
+        assert r.status_code == 200
+        assert r.content == b"\xff\xd8jpeg\xff\xd9"
+    assert series.count == before + 1
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from app.bringup import BringUp
+
+
+def _fail():
+    raise OSError("no device")
+
+
+@pytest.mark.asyncio
+async def test_bringup_reports_each_subsystem_state():
+    b = BringUp()
+    assert b.status()["ready"] is False
+    results = await asyncio.gather(
+        b.start("camera", lambda: True),
+        b.start("imu", lambda: False),
+        b.start("xbee", _fail),
+    )
+    assert results == [True, False, False]
+    status = b.status()
+    assert status["ready"] is True
+    assert status["subsystems"]["camera"]["state"] == "ready"
+    assert status["subsystems"]["imu"]["state"] == "fallback"
+    assert status["subsystems"]["xbee"] == {"state": "failed", "error": "no device",
+                                            "seconds": status["subsystems"]["xbee"]["seconds"]}
+
+    b.mark("first_frame")
+    first = b.status()["milestones"]["first_frame"]
+    b.mark("first_frame")
+    assert b.status()["milestones"]["first_frame"] == first
+
+
+@pytest.mark.asyncio
+async def test_camera_bringup_records_first_frame(monkeypatch):
+    from app import main
+    monkeypatch.setattr(main.camera, "init", lambda: True)
+    monkeypatch.setattr(main.camera, "capture_frame", lambda: b"jpeg")
+    monkeypatch.setattr(main, "bringup", BringUp())
+    assert await main.bring_up_camera() is True
+    status = main.bringup.status()
+    assert status["subsystems"]["camera"]["state"] == "ready"
+    assert "first_frame" in status["milestones"]
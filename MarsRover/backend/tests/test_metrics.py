@@ -0,0 +1,52 @@
+import threading
+import time
+
+from app import metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = []  # keep test metrics out of the global /metrics registry
+    h = metrics.Histogram("test_latency_seconds", "Test latency", ("op",), buckets=(0.1, 1.0),
+                          registry=registry)
+    series = h.labels(op="read")
+    for v in (0.05, 0.5, 0.5, 2.0):
+        series.observe(v)
+    text = metrics.render(registry)
+    assert '# TYPE test_latency_seconds histogram' in text
+    assert 'test_latency_seconds_bucket{op="read",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{op="read",le="1.0"} 3' in text
+    assert 'test_latency_seconds_bucket{op="read",le="+Inf"} 4' in text
+    assert 'test_latency_seconds_count{op="read"} 4' in text
+
+
+def test_rate_counts_ticks_in_window():
+    registry = []
+    r = metrics.Rate("test_fps", "Test fps", window=2.0, registry=registry)
+    now = time.monotonic()
+    for i in range(9):
+        r.tick(now - 4.25 + i * 0.5)
+    # ticks older than the 2s window are dropped
+    assert "test_fps 2.0\n" in metrics.render(registry)
+
+
+def test_metrics_in_own_registry_not_served_globally():
+    metrics.Counter("test_isolated", "Test counter", registry=[])
+    assert "test_isolated" not in metrics.render()
+
+
+def test_sample_stacks_reports_other_threads():
+    stop = threading.Event()
+
+    def busy_wait_for_profiler():
+        while not stop.is_set():
+            time.sleep(0.001)
+
+    t = threading.Thread(target=busy_wait_for_profiler)
+    t.start()
+    try:
+        out = metrics.sample_stacks(seconds=0.1, interval=0.01)
+    finally:
+        stop.set()
+        t.join()
+    assert "busy_wait_for_profiler" in out
+    assert "sample_stacks" not in out
@@ -0,0 +1,116 @@
+import json
+import os
+
+from app.recorder import EventRecorder, FrameRingBuffer, ImuTrigger
+
+
+def test_ring_buffer_bounded_by_bytes_and_age():
+    buf = FrameRingBuffer(max_bytes=30, max_seconds=5.0)
+    for i in range(10):
+        buf.append(b"x" * 10, ts=float(i))
+    stats = buf.stats()
+    assert stats["frames"] == 3
+    assert stats["bytes"] == 30
+
+    buf = FrameRingBuffer(max_bytes=10_000, max_seconds=2.0)
+    for i in range(10):
+        buf.append(b"x", ts=float(i))
+    assert [ts for ts, _ in buf.since(0.0)] == [7.0, 8.0, 9.0]
+
+
+def test_trigger_writes_pre_and_post_roll(tmp_path):
+    rec = EventRecorder(str(tmp_path), max_bytes=1_000_000, pre_roll=2.0, post_roll=2.0)
+    for i in range(10):
+        rec.add_frame(bytes([i]), ts=float(i))
+    rec.trigger("api", ts=9.0)
+    rec.trigger("imu: bump", ts=10.0)  # retrigger extends post-roll to t=12
+    for i in range(10, 15):
+        rec.add_frame(bytes([i]), ts=float(i))
+    rec.close()
+
+    meta_files = [f for f in os.listdir(tmp_path) if f.endswith(".json")]
+    assert len(meta_files) == 1
+    meta = json.loads((tmp_path / meta_files[0]).read_text())
+    assert meta["reasons"] == ["api", "imu: bump"]
+    assert meta["pre_roll_s"] == 2.0
+    with open(tmp_path / meta["file"], "rb") as f:
+        assert f.read() == bytes(range(7, 13))
+
+
+def test_trigger_without_frames_writes_nothing(tmp_path):
+    rec = EventRecorder(str(tmp_path), max_bytes=1_000_000, pre_roll=2.0, post_roll=2.0)
+    assert rec.trigger("api", ts=0.0)["frames"] == 0
+    rec.poll(ts=5.0)
+    rec.close()
+    assert os.listdir(tmp_path) == []
+    assert rec.status()["clips"] == []
+
+
+def test_imu_trigger_detects_tilt_and_respects_cooldown():
+    trig = ImuTrigger(accel_threshold=4.0, tilt_deg=30.0, jerk_threshold=0, cooldown=5.0)
+    assert trig.check({"accel": [0.0, 0.0, 9.81]}, ts=0.0) is None
+    assert trig.check({"accel": [9.81, 0.0, 0.0]}, ts=1.0).startswith("tilt")
+    assert trig.check({"accel": [9.81, 0.0, 0.0]}, ts=2.0) is None
+    assert trig.check({"accel": [0.0, 0.0, 20.0]}, ts=7.0).startswith("bump")
+    assert trig.check({"error": "no sensor"}, ts=8.0) is None
+
+
+def test_event_closed_early_at_byte_budget(tmp_path):
+    rec = EventRecorder(str(tmp_path), max_bytes=1_000_000, pre_roll=2.0, post_roll=10.0,
+                        max_event_bytes=30)
+    rec.add_frame(b"x" * 10, ts=0.0)
+    rec.trigger("api", ts=0.5)
+    for i in range(1, 6):
+        rec.add_frame(b"x" * 10, ts=float(i))
+    assert rec.status()["active"] is None
+    rec.close()
+
+    meta = json.loads(next(tmp_path.glob("*.json")).read_text())
+    assert meta["truncated"] is True
+    assert meta["frames"] == 4  # pre-roll frame plus 30 bytes of post-roll
+
+
+def test_default_budget_keeps_full_pre_and_post_roll_for_still_frames(tmp_path):
+    # ~1 MB full-resolution stills at 5 fps with the backend's default settings
+    rec = EventRecorder(str(tmp_path), max_bytes=64 * 1024 * 1024, pre_roll=10.0, post_roll=10.0)
+    frame = b"x" * 1_000_000
+    for i in range(100):
+        rec.add_frame(frame, ts=i * 0.2)
+    rec.trigger("api", ts=19.9)
+    for i in range(100, 160):
+        rec.add_frame(frame, ts=i * 0.2)
+    rec.close()
+
+    meta = json.loads(next(tmp_path.glob("*.json")).read_text())
+    assert meta["truncated"] is False
+    assert meta["pre_roll_s"] >= 9.8
+    assert meta["duration_s"] >= 19.8
+
+
+def test_held_tilt_fires_once_until_it_recovers():
+    trig = ImuTrigger(accel_threshold=4.0, tilt_deg=35.0, jerk_threshold=0, cooldown=5.0,
+                      tilt_hysteresis=5.0)
+    parked = {"accel": [6.0, 0.0, 7.7]}  # ~37.9 deg, parked on a slope
+    fired = [trig.check(parked, ts=float(t)) for t in range(0, 60, 5)]
+    assert fired[0].startswith("tilt")
+    assert fired[1:] == [None] * 11
+
+    # inside the hysteresis band: still not re-armed
+    assert trig.check({"accel": [5.8, 0.0, 7.9]}, ts=61.0) is None  # ~36 deg
+    assert trig.check(parked, ts=70.0) is None
+    # level again, then a new crossing fires
+    assert trig.check({"accel": [0.0, 0.0, 9.81]}, ts=75.0) is None
+    assert trig.check(parked, ts=80.0).startswith("tilt")
+
+
+def test_old_clips_pruned_to_disk_cap(tmp_path):
+    rec = EventRecorder(str(tmp_path), max_bytes=1_000_000, pre_roll=0.5, post_roll=0.0,
+                        max_disk_bytes=25, max_clips=10)
+    for i in range(4):
+        rec.add_frame(b"x" * 10, ts=float(i))
+        rec.trigger(f"clip {i}", ts=float(i))
+        rec.poll(ts=float(i))
+        rec.close()
+    metas = sorted(json.loads(p.read_text())["reasons"][0] for p in tmp_path.glob("*.json"))
+    assert metas == ["clip 2", "clip 3"]
+    assert len(list(tmp_path.glob("*.mjpeg"))) == 2
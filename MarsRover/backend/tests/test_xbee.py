@@ -0,0 +1,66 @@
+import threading
+import time
+
+from drivers import xbee
+
+
+class FakeSerial:
+    """Loopback port: every written command is answered with an "OK" line."""
+
+    def __init__(self, *args, **kwargs):
+        self._rx = []
+        self._cond = threading.Condition()
+        self.timeout = kwargs.get("timeout", 0.5)
+
+    @property
+    def in_waiting(self):
+        return sum(len(line) for line in self._rx)
+
+    def write(self, data):
+        with self._cond:
+            self._rx.append(b"OK " + data)
+            self._cond.notify_all()
+
+    def inject(self, line):
+        with self._cond:
+            self._rx.append(line)
+            self._cond.notify_all()
+
+    def readline(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._rx, timeout=self.timeout)
+            return self._rx.pop(0) if self._rx else b""
+
+    def close(self):
+        pass
+
+
+def test_listener_routes_replies_to_sender(monkeypatch, capsys, tmp_path):
+    fake = FakeSerial(timeout=0.05)
+    monkeypatch.setattr(xbee, "_load", lambda: True)
+    monkeypatch.setattr(xbee, "_port", fake)
+    monkeypatch.setattr(xbee, "_listening", False)
+    port = tmp_path / "ttyXBEE"
+    port.touch()
+    monkeypatch.setattr(xbee, "SERIAL_PORT", str(port))
+
+    received = []
+    stop = threading.Event()
+
+    def listen():
+        while not stop.is_set():
+            received.extend(xbee.read_commands(("RECORD",)))
+
+    t = threading.Thread(target=listen)
+    t.start()
+    try:
+        while not xbee._listening:
+            time.sleep(0.001)
+        fake.inject(b"RECORD tilt\n")
+        assert xbee.send_command("PING") is True
+        time.sleep(0.1)
+    finally:
+        stop.set()
+        t.join()
+    assert received == ["RECORD tilt"]
+    assert "xbee resp: b'OK PING'" in capsys.readouterr().out
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Cold-start benchmark: import time, time to open the port, subsystem bring-up and first frame
+
+Usage:
+  cd backend && python tools/bench_startup.py [--runs 3] [--timeout 60] [--json]
+
+Starts the backend with uvicorn on a free port and polls /api/status until every
+subsystem has finished bring-up and the first camera frame (if any) is captured.
+Run it after changes to startup code and compare against previous results.
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def measure_imports(top=8):
+    """Return (seconds to import app.main, slowest modules by cumulative import time)."""
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=BACKEND_DIR,
+                          capture_output=True, text=True, timeout=120)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    modules = []
+    for line in proc.stderr.splitlines():
+        m = re.match(r'import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)', line)
+        # modules imported directly by a top-level import, e.g. fastapi under app.main
+        if m and len(m.group(2)) == 3:
+            modules.append((int(m.group(1)) / 1e6, m.group(3)))
+    modules.sort(reverse=True)
+    return float(proc.stdout.strip().splitlines()[-1]), modules[:top]
+
+
+def get_status(port):
+    with urllib.request.urlopen(f'http://127.0.0.1:{port}/api/status', timeout=1) as r:
+        return json.load(r)
+
+
+def measure_boot(timeout):
+    """Start the server and return timings in seconds from process spawn."""
+    port = free_port()
+    spawned = time.monotonic()
+    proc = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'app.main:app', '--port', str(port)],
+                            cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    result = {'listening_s': None, 'ready_s': None, 'first_frame_s': None, 'status': None}
+    try:
+        while time.monotonic() - spawned < timeout:
+            try:
+                status = get_status(port)
+            except OSError:
+                time.sleep(0.02)
+                continue
+            now = round(time.monotonic() - spawned, 3)
+            if result['listening_s'] is None:
+                result['listening_s'] = now
+            if status['ready'] and result['ready_s'] is None:
+                result['ready_s'] = now
+            if 'first_frame' in status['milestones'] and result['first_frame_s'] is None:
+                result['first_frame_s'] = now
+            result['status'] = status
+            camera_ok = status['subsystems'].get('camera', {}).get('state') == 'ready'
+            if result['ready_s'] is not None and (result['first_frame_s'] is not None or not camera_ok):
+                break
+            time.sleep(0.02)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=1)
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--json', action='store_true', help='print one JSON object per run')
+    args = parser.parse_args()
+
+    for run in range(args.runs):
+        import_s, slowest = measure_imports()
+        boot = measure_boot(args.timeout)
+        if args.json:
+            print(json.dumps({'import_s': round(import_s, 3), **boot}))
+            continue
+        print(f'Run {run + 1}/{args.runs}')
+        print(f'  import app.main:      {import_s:.3f}s')
+        for seconds, name in slowest:
+            print(f'    {seconds:7.3f}s  {name}')
+        for key in ('listening_s', 'ready_s', 'first_frame_s'):
+            value = boot[key]
+            print(f'  {key[:-2] + ":":21} ' + (f'{value:.3f}s' if value is not None else 'not reached'))
+        if boot['status']:
+            for name, sub in boot['status']['subsystems'].items():
+                extra = f" ({sub['error']})" if 'error' in sub else ''
+                print(f"  {name:21} {sub['state']} at {sub.get('seconds', '?')}s after app start{extra}")
+
+
+if __name__ == '__main__':
+    main()
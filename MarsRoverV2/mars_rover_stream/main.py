@@ -6,14 +6,19 @@ Minimal dependencies for RPi 5
 """
 
 import io
+import os
+import bisect
+import json
+import queue
 import time
 import threading
-from flask import Flask, render_template, Response
-from picamera2 import Picamera2, Preview
-from picamera2.encoders import MJPEGEncoder
-from picamera2.outputs import FileOutput
+from collections import deque
+from flask import Flask, render_template, Response, request
 import logging
 
+# Reference point for startup timings reported by /status
+STARTED_AT = time.monotonic()
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -21,45 +26,167 @@ logger = logging.getLogger(__name__)
 # Flask app initialization
 app = Flask(__name__, template_folder='../templates')
 
-# Global camera instance
+# Global camera instance; picamera2 is imported in the camera thread so the web
+# server can start listening while libcamera loads and the sensor comes up
 camera = None
 camera_lock = threading.Lock()
 current_frame = None
+frame_ready = threading.Condition()  # notified whenever current_frame is replaced
+camera_state = 'initializing'
+camera_ready_s = None
+first_frame_s = None
 
 # Camera configuration
 CAMERA_RESOLUTION = (1280, 720)  # IMX519 supports up to 4K, adjust as needed
 CAMERA_FPS = 30
 JPEG_QUALITY = 85
+CAMERA_RETRY_DELAY = 2.0  # seconds between camera bring-up attempts
+
+# Event recording configuration: the last RECORD_BUFFER_SECONDS of encoded frames
+# (capped at RECORD_BUFFER_BYTES) stay in RAM and are dumped on POST /record
+RECORD_BUFFER_BYTES = 64 * 1024 * 1024
+RECORD_BUFFER_SECONDS = 30.0
+RECORD_PRE_ROLL = 10.0
+RECORD_POST_ROLL = 10.0
+# Post-trigger frames are held in RAM until written; pre-roll frames are shared
+# with the ring buffer, so only the post-roll counts against this budget
+RECORD_MAX_POST_ROLL_BYTES = RECORD_BUFFER_BYTES
+RECORD_DIR = os.path.join(os.path.dirname(__file__), '..', 'recordings')
+
+# Ring buffer of (timestamp, jpeg) pairs and the clip currently being recorded
+frame_buffer = deque()
+frame_buffer_bytes = 0
+record_lock = threading.Lock()
+active_clip = None
+clip_queue = queue.Queue()
+
+
+class Histogram:
+    """Minimal Prometheus-style histogram, cheap enough to leave on during a run"""
+    
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+    
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.lock = threading.Lock()
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value):
+        i = bisect.bisect_left(self.BUCKETS, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+    
+    def render(self):
+        with self.lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        cumulative = 0
+        for bound, c in zip([str(b) for b in self.BUCKETS] + ['+Inf'], counts):
+            cumulative += c
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{self.name}_sum {total}')
+        lines.append(f'{self.name}_count {count}')
+        return lines
+
+
+class FrameRate:
+    """Frames per second measured over a sliding window"""
+    
+    def __init__(self, window=5.0):
+        self.window = window
+        self.lock = threading.Lock()
+        self.ticks = deque()
+    
+    def tick(self):
+        now = time.monotonic()
+        with self.lock:
+            self.ticks.append(now)
+            while now - self.ticks[0] > self.window:
+                self.ticks.popleft()
+    
+    @property
+    def value(self):
+        now = time.monotonic()
+        with self.lock:
+            recent = sum(1 for t in self.ticks if now - t <= self.window)
+        return round(recent / self.window, 2)
+
+
+# Per-frame timings and measured frame rates, served at /metrics
+capture_seconds = Histogram('camera_capture_seconds', 'Time to grab one frame from the camera')
+encode_seconds = Histogram('camera_encode_seconds', 'Time to JPEG-encode one frame')
+send_seconds = Histogram('frame_send_seconds', 'Time to send one MJPEG frame to a client')
+capture_fps = FrameRate()
+# One FrameRate per connected /stream client; a shared counter would add
+# every viewer's frames together
+stream_clients = set()
+stream_clients_lock = threading.Lock()
+
+
+def stream_fps_stats():
+    """Return (client count, min fps, average fps) across connected stream clients"""
+    with stream_clients_lock:
+        clients = list(stream_clients)
+    if not clients:
+        return 0, 0.0, 0.0
+    rates = [c.value for c in clients]
+    return len(rates), min(rates), round(sum(rates) / len(rates), 2)
 
 
 def initialize_camera():
     """Initialize the IMX519 camera"""
     global camera
     
+    cam = None
     try:
         logger.info("Initializing IMX519 camera...")
-        camera = Picamera2()
+        from picamera2 import Picamera2
+        cam = Picamera2()
         
         # Configure camera with optimized settings
-        config = camera.create_video_configuration(
+        config = cam.create_video_configuration(
             main={"size": CAMERA_RESOLUTION, "format": "RGB888"},
             encode="mjpeg",
             controls={"FrameRate": CAMERA_FPS}
         )
         
-        camera.configure(config)
-        camera.start()
+        cam.configure(config)
+        cam.start()
+        camera = cam
         logger.info(f"Camera initialized: {CAMERA_RESOLUTION} @ {CAMERA_FPS}FPS")
         return True
         
     except Exception as e:
         logger.error(f"Failed to initialize camera: {e}")
+        if cam is not None:
+            try:
+                cam.close()
+            except Exception:
+                pass
         return False
 
 
+def run_camera():
+    """Bring the camera up in the background, retrying until it works, then capture"""
+    global camera_state, camera_ready_s
+    
+    while not initialize_camera():
+        camera_state = 'retrying'
+        time.sleep(CAMERA_RETRY_DELAY)
+    
+    camera_state = 'initialized'
+    camera_ready_s = round(time.monotonic() - STARTED_AT, 3)
+    capture_frames()
+
+
 def capture_frames():
     """Continuously capture frames from camera"""
-    global current_frame
+    global current_frame, first_frame_s
     
     if camera is None:
         logger.error("Camera not initialized")
@@ -71,7 +198,9 @@ def capture_frames():
             try:
                 with camera_lock:
                     # Capture frame as JPEG
+                    started = time.perf_counter()
                     frame = camera.capture_array("main")
+                    captured = time.perf_counter()
                     
                     # Convert to JPEG bytes
                     from PIL import Image
@@ -80,6 +209,16 @@ def capture_frames():
                     img.save(buffer, format='JPEG', quality=JPEG_QUALITY)
                     current_frame = buffer.getvalue()
                 
+                with frame_ready:
+                    frame_ready.notify_all()
+                
+                capture_seconds.observe(captured - started)
+                encode_seconds.observe(time.perf_counter() - captured)
+                capture_fps.tick()
+                if first_frame_s is None:
+                    first_frame_s = round(time.monotonic() - STARTED_AT, 3)
+                    logger.info(f"First frame captured {first_frame_s}s after start")
+                buffer_frame(current_frame)
                 time.sleep(1.0 / CAMERA_FPS)  # Maintain FPS
                 
             except Exception as e:
@@ -90,29 +229,143 @@ def capture_frames():
         logger.info("Frame capture stopped")
 
 
+def buffer_frame(frame):
+    """Add an encoded frame to the ring buffer and the active clip, if any"""
+    global frame_buffer_bytes, active_clip
+    
+    now = time.monotonic()
+    finished = None
+    with record_lock:
+        frame_buffer.append((now, frame))
+        frame_buffer_bytes += len(frame)
+        while len(frame_buffer) > 1 and (
+            frame_buffer_bytes > RECORD_BUFFER_BYTES
+            or now - frame_buffer[0][0] > RECORD_BUFFER_SECONDS
+        ):
+            _, old = frame_buffer.popleft()
+            frame_buffer_bytes -= len(old)
+        
+        if active_clip is not None:
+            if active_clip['bytes'] + len(frame) > RECORD_MAX_POST_ROLL_BYTES:
+                # Close early rather than hold more than the budget in RAM
+                active_clip['truncated'] = True
+                finished, active_clip = active_clip, None
+            else:
+                active_clip['frames'].append(frame)
+                active_clip['bytes'] += len(frame)
+                if now >= active_clip['end']:
+                    finished, active_clip = active_clip, None
+    
+    if finished is not None:
+        clip_queue.put(finished)
+
+
+def trigger_recording(reason):
+    """Start a clip with pre-roll from the ring buffer, or extend the active one"""
+    global active_clip
+    
+    now = time.monotonic()
+    with record_lock:
+        if active_clip is None:
+            active_clip = {
+                'id': time.strftime('%Y%m%d-%H%M%S'),
+                'reasons': [],
+                'start': now,
+                'frames': [f for ts, f in frame_buffer if ts >= now - RECORD_PRE_ROLL],
+                'truncated': False,
+            }
+            active_clip['bytes'] = 0  # post-trigger bytes only
+        active_clip['reasons'].append(reason)
+        # Retriggers extend the post-roll, capped at 60s so the clip can't grow forever
+        active_clip['end'] = min(now + RECORD_POST_ROLL, active_clip['start'] + 60.0)
+        return {
+            'id': active_clip['id'],
+            'reasons': list(active_clip['reasons']),
+            'frames': len(active_clip['frames']),
+            # the clip is kept in case the camera comes up during post-roll;
+            # clips that end with no frames are never written
+            'status': 'recording' if camera_state == 'initialized' else 'no camera',
+        }
+
+
+def write_clips():
+    """Write finished clips to disk off the capture and streaming threads"""
+    while True:
+        clip = clip_queue.get()
+        if clip is None:
+            return
+        if not clip['frames']:
+            logger.warning(f"Skipping clip {clip['id']}: no frames captured")
+            continue
+        try:
+            os.makedirs(RECORD_DIR, exist_ok=True)
+            path = os.path.join(RECORD_DIR, clip['id'])
+            with open(path + '.mjpeg', 'wb') as f:
+                for frame in clip['frames']:
+                    f.write(frame)
+            with open(path + '.json', 'w') as f:
+                json.dump({
+                    'reasons': clip['reasons'],
+                    'frames': len(clip['frames']),
+                    'truncated': clip['truncated'],
+                }, f)
+            logger.info(f"Saved clip {path}.mjpeg ({len(clip['frames'])} frames)")
+        except Exception as e:
+            logger.error(f"Failed to write clip: {e}")
+
+
+def flush_recordings(writer_thread, timeout=10.0):
+    """Hand the active clip to the writer and wait for queued clips to be written"""
+    global active_clip
+    
+    with record_lock:
+        clip, active_clip = active_clip, None
+    if clip is not None:
+        clip_queue.put(clip)
+    clip_queue.put(None)
+    writer_thread.join(timeout)
+    if writer_thread.is_alive():
+        logger.error("Clip writer did not finish; some recordings may be incomplete")
+
+
 def generate_mjpeg():
     """Generator for MJPEG stream"""
     boundary = b'--MJPEGBOUNDARY'
     
     logger.info("MJPEG stream requested")
+    last_sent = None
+    client_fps = FrameRate()
+    with stream_clients_lock:
+        stream_clients.add(client_fps)
     try:
         while True:
-            if current_frame is not None:
-                with camera_lock:
-                    frame_data = current_frame
-                
-                # MJPEG boundary and headers
-                yield boundary + b'\r\n'
-                yield b'Content-Type: image/jpeg\r\n'
-                yield b'Content-Length: ' + str(len(frame_data)).encode() + b'\r\n'
-                yield b'\r\n'
-                yield frame_data
-                yield b'\r\n'
-            else:
-                time.sleep(0.01)
-                
+            # Wait for a frame this client hasn't been sent yet
+            with frame_ready:
+                frame_ready.wait_for(
+                    lambda: current_frame is not None and current_frame is not last_sent,
+                    timeout=1.0
+                )
+                frame_data = current_frame
+            if frame_data is None or frame_data is last_sent:
+                continue
+            
+            # MJPEG boundary and headers; each yield resumes once the chunk is written
+            started = time.perf_counter()
+            yield boundary + b'\r\n'
+            yield b'Content-Type: image/jpeg\r\n'
+            yield b'Content-Length: ' + str(len(frame_data)).encode() + b'\r\n'
+            yield b'\r\n'
+            yield frame_data
+            yield b'\r\n'
+            send_seconds.observe(time.perf_counter() - started)
+            client_fps.tick()
+            last_sent = frame_data
+            
     except GeneratorExit:
         logger.info("MJPEG stream closed")
+    finally:
+        with stream_clients_lock:
+            stream_clients.discard(client_fps)
 
 
 @app.route('/')
@@ -130,14 +383,47 @@ def stream():
     )
 
 
+@app.route('/record', methods=['POST'])
+def record():
+    """Trigger an event recording with pre-roll and post-roll"""
+    payload = request.get_json(silent=True) or {}
+    return trigger_recording(payload.get('reason', 'api'))
+
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text-format metrics"""
+    clients, min_fps, avg_fps = stream_fps_stats()
+    lines = []
+    for histogram in (capture_seconds, encode_seconds, send_seconds):
+        lines.extend(histogram.render())
+    lines.append('# TYPE frames_per_second gauge')
+    lines.append(f'frames_per_second{{stream="capture"}} {capture_fps.value}')
+    lines.append(f'frames_per_second{{stream="mjpeg",stat="min"}} {min_fps}')
+    lines.append(f'frames_per_second{{stream="mjpeg",stat="avg"}} {avg_fps}')
+    lines.append('# TYPE mjpeg_clients gauge')
+    lines.append(f'mjpeg_clients {clients}')
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+
 @app.route('/status')
 def status():
     """Return system status"""
+    clients, min_fps, avg_fps = stream_fps_stats()
     return {
         'status': 'running',
-        'camera': 'initialized' if camera is not None else 'not initialized',
+        'camera': camera_state,
+        'uptime_s': round(time.monotonic() - STARTED_AT, 3),
+        'camera_ready_s': camera_ready_s,
+        'first_frame_s': first_frame_s,
         'resolution': CAMERA_RESOLUTION,
-        'fps': CAMERA_FPS
+        'fps': CAMERA_FPS,
+        'measured_fps': capture_fps.value,
+        'stream_clients': clients,
+        'stream_fps': avg_fps,
+        'stream_fps_min': min_fps,
+        'recording': active_clip is not None,
+        'buffered_frames': len(frame_buffer)
     }
 
 
@@ -147,15 +433,15 @@ def main():
     logger.info("Mars Rover Streaming System")
     logger.info("=" * 50)
     
-    # Initialize camera
-    if not initialize_camera():
-        logger.error("Failed to initialize camera. Exiting.")
-        return 1
-    
-    # Start frame capture in background thread
-    capture_thread = threading.Thread(target=capture_frames, daemon=True)
+    # Bring up the camera and start frame capture in a background thread so the
+    # web server is reachable immediately (e.g. after a brownout reboot)
+    capture_thread = threading.Thread(target=run_camera, daemon=True)
     capture_thread.start()
-    logger.info("Frame capture thread started")
+    logger.info("Camera thread started")
+    
+    # Start clip writer in background thread
+    writer_thread = threading.Thread(target=write_clips, daemon=True)
+    writer_thread.start()
     
     # Start Flask server
     logger.info("Starting web server on 0.0.0.0:5000")
@@ -166,6 +452,7 @@ def main():
     except KeyboardInterrupt:
         logger.info("Shutting down...")
     finally:
+        flush_recordings(writer_thread)
         if camera is not None:
             camera.stop()
             logger.info("Camera stopped")